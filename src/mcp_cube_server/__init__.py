@@ -1,38 +1,47 @@
 import argparse
+import functools
+import importlib
 import json
 import logging
 import os
+from itertools import zip_longest
+from types import ModuleType
 
-import dotenv
-
-from . import server
+_ENV_VARS = ("CUBE_ENDPOINT", "CUBE_API_SECRET", "CUBE_TOKEN_PAYLOAD")
 
 
 def args_to_kwargs(unknown: list[str]) -> dict[str, str | bool]:
     extras: dict[str, str | bool] = {}
-    i = 0
-    while i < len(unknown):
-        if unknown[i].startswith("--"):
-            key = unknown[i][2:]  # Remove '--' prefix
-            if i + 1 >= len(unknown) or unknown[i + 1].startswith("--"):
+    # Pair each token with its successor; values never start with "--" so they are skipped as keys
+    for token, following in zip_longest(unknown, unknown[1:]):
+        if token.startswith("--"):
+            key = token[2:]  # Remove '--' prefix
+            if following is None or following.startswith("--"):
                 extras[key] = True  # Flag argument
-                i += 1
             else:
-                extras[key] = unknown[i + 1]  # Key-value pair
-                i += 2
-        else:
-            i += 1
+                extras[key] = following  # Key-value pair
 
     return extras
 
 
+@functools.cache
+def _load_dotenv() -> None:
+    """Load the .env file at most once per process."""
+    # Deferred so --help and argument errors stay fast
+    import dotenv
+
+    dotenv.load_dotenv()
+
+
 def main() -> None:
     """Main entry point for the package."""
     parser = argparse.ArgumentParser(description="Cube MCP Server")
     parser.add_argument("--log_dir", required=False, default=None, help="Directory to log to")
     parser.add_argument("--log_level", required=False, default="INFO", help="Logging level")
 
-    dotenv.load_dotenv()
+    # Skip the .env search entirely when the environment is already populated
+    if not all(os.getenv(name) for name in _ENV_VARS):
+        _load_dotenv()
 
     required = {
         "endpoint": os.getenv("CUBE_ENDPOINT"),
@@ -65,6 +74,8 @@ def main() -> None:
         file_handler.setFormatter(formatter)
         logger.addHandler(file_handler)
 
+    from . import server
+
     try:
         token_payload_str = required["token_payload"] or "{}"
         token_payload = json.loads(token_payload_str)
@@ -86,6 +97,13 @@ def main() -> None:
     )
 
 
+def __getattr__(name: str) -> ModuleType:
+    # The server module pulls in FastMCP, requests and pydantic, so only import it on first use
+    if name == "server":
+        return importlib.import_module(f"{__name__}.server")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Optionally expose other important items at package level
 __all__ = ["main", "server"]
 
@@ -1,138 +1,304 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import copy
+import hashlib
+import hmac
 import json
 import logging
+import random
+import secrets
+import threading
 import time
-import uuid
-from typing import Any, Literal
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import partial
+from itertools import chain
+from typing import Any, Literal, Self, cast
 
-import jwt
 import requests
 import yaml
 from mcp.server.fastmcp import FastMCP
 from mcp.types import EmbeddedResource, TextContent, TextResourceContents
 from pydantic import AnyUrl, BaseModel, Field
+from requests.adapters import HTTPAdapter
+
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:  # pragma: no cover - PyYAML built without libyaml
+    from yaml import SafeDumper as YamlDumper  # type: ignore[assignment]
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None  # type: ignore[assignment]
+
+
+# Bind the emitter settings once instead of rebuilding the keyword arguments on every call
+_dump_yaml = cast(
+    "Callable[..., str]",
+    partial(yaml.dump, Dumper=YamlDumper, indent=2, default_flow_style=False),
+)
+
+
+_DATA_DESC_PREFIX = "Here is a description of the data available via the read_data tool:\n\n"
+
+
+def _pick_title(member: dict[str, Any]) -> Any:
+    """Prefer a member's short title, falling back to its full title."""
+    return member.get("shortTitle") or member.get("title")
 
 
 def data_to_yaml(data: Any) -> str:
-    return yaml.dump(data, indent=2, sort_keys=False)
+    return _dump_yaml(data, sort_keys=False)
+
+
+def to_json(data: Any) -> str:
+    """Serialize to compact JSON, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data).decode()
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits; the stdlib handles those
+    return json.dumps(data, separators=(",", ":"))
+
+
+def from_json(data: bytes | str) -> Any:
+    """Parse JSON, using orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass  # Let the stdlib parse or reject it with its usual error
+    return json.loads(data)
+
+
+def _query_cache_key(query: dict[str, Any]) -> str:
+    """Serialize a query to a cache key that ignores key order everywhere except in order."""
+    # Cube sorts by the order entries in sequence, so keep them as an ordered list of pairs
+    order = query.get("order")
+    if isinstance(order, dict):
+        query = {**query, "order": list(order.items())}
+    return json.dumps(query, sort_keys=True, separators=(",", ":"))
+
+
+class LazyJson:
+    """Log argument that is only serialized to JSON if the record is actually emitted."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Any) -> None:
+        self.data = data
+
+    def __str__(self) -> str:
+        return to_json(self.data)
+
+
+def to_number(value: Any) -> Any:
+    """Cast a numeric value to an int or float, returning it unchanged if it is not numeric."""
+    # Plain integer strings are by far the most common case
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return value
+    return int(number) if number.is_integer() else number
+
+
+# Tokens are always HS256, so the encoded header {"alg":"HS256","typ":"JWT"} never changes
+_JWT_HEADER = b"eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
 
 
 class CubeClient:
     Route = Literal["meta", "load"]
     max_wait_time = 10
     request_backoff = 1
+    token_ttl = 3600
+    token_refresh_skew = 60
+    meta_ttl = 60
+    query_cache_ttl = 15.0
+    query_cache_size = 128
 
     def __init__(
-        self, endpoint: str, api_secret: str, token_payload: dict[str, Any], logger: logging.Logger
+        self,
+        endpoint: str,
+        api_secret: str,
+        token_payload: dict[str, Any],
+        logger: logging.Logger,
     ) -> None:
         self.endpoint = endpoint
+        base_url = endpoint.rstrip("/")
+        self._urls: dict[str, str] = {"meta": f"{base_url}/meta", "load": f"{base_url}/load"}
         self.api_secret = api_secret
+        # Encode the HMAC key once instead of on every token refresh
+        self._signing_key = api_secret.encode()
         self.token_payload = token_payload
         self.token: str | None = None
+        self._token_exp = 0.0
         self.logger = logger
+        # Reuse connections across requests, including the "Continue wait" polls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self._refresh_token()
+        self._meta_cache: tuple[float, dict[str, Any] | None] = (0.0, None)
         self.meta = self.describe()
+        self._query_cache: OrderedDict[tuple[str, bool], tuple[float, dict[str, Any]]] = (
+            OrderedDict()
+        )
+        # read_data runs query() on worker threads, so guard the LRU bookkeeping
+        self._query_cache_lock = threading.Lock()
 
     def _generate_token(self) -> str:
-        return jwt.encode(self.token_payload, self.api_secret, algorithm="HS256")
+        # An explicit exp in the configured payload wins over the default TTL
+        payload = {"exp": int(time.time()) + self.token_ttl, **self.token_payload}
+        self._token_exp = float(payload["exp"])
+        signing_input = _JWT_HEADER + b"." + _b64url(to_json(payload).encode())
+        signature = hmac.new(self._signing_key, signing_input, hashlib.sha256).digest()
+        return (signing_input + b"." + _b64url(signature)).decode()
 
     def _refresh_token(self) -> None:
         self.token = self._generate_token()
+        self.session.headers["Authorization"] = self.token
+
+    def _ensure_token(self) -> None:
+        """Refresh the token before it expires rather than waiting for a 403."""
+        if self.token is None or time.time() > self._token_exp - self.token_refresh_skew:
+            self._refresh_token()
 
     def _request(self, route: Route, **params: Any) -> dict[str, Any]:
         request_time = time.time()
-        headers = {"Authorization": self.token}
-        url = f"{self.endpoint if self.endpoint[-1] != '/' else self.endpoint[:-1]}/{route}"
-        serialized_params = {k: json.dumps(v) for k, v in params.items()}
+        self._ensure_token()
+        url = self._urls[route]
+        # Serialized once and reused for every poll of the same request
+        serialized_params = {k: to_json(v) for k, v in params.items()}
 
+        token_refreshed = False
+        attempt = 0
         try:
-            response = requests.get(url, headers=headers, params=serialized_params, timeout=(5, 10))
-
-            # Handle "continue wait" responses
-            while response.json().get("error") == "Continue wait":
-                if time.time() - request_time > self.max_wait_time:
-                    self.logger.error(f"Request timed out after {self.max_wait_time} seconds")
-                    return {
-                        "error": "Request timed out. Something may have gone wrong or the request may be too complex."
-                    }
-                self.logger.warning(
-                    f"Request incomplete, polling again in {self.request_backoff} second(s)"
-                )
-                time.sleep(self.request_backoff)
-                response = requests.get(
-                    url, headers=headers, params=serialized_params, timeout=(5, 10)
-                )
-
-            # Handle 403 responses by trying to refresh the token once
-            if response.status_code == 403:
-                self.logger.warning("Received 403, attempting token refresh")
-                self._refresh_token()
-                headers = {"Authorization": self.token}
-                resp = requests.get(url, headers=headers, params=serialized_params, timeout=(5, 10))
-                result2: dict[str, Any] = resp.json()
-                return result2
-
-            if response.status_code != 200:
-                self.logger.error(f"Request failed with error: {str(response.json().get('error'))}")
-
-            result: dict[str, Any] = response.json()
-            return result
+            while True:
+                response = self.session.get(url, params=serialized_params, timeout=(5, 10))
+                result: dict[str, Any] = from_json(response.content)
+
+                # Handle 403 responses by trying to refresh the token once
+                if response.status_code == 403 and not token_refreshed:
+                    self.logger.warning("Received 403, attempting token refresh")
+                    self._refresh_token()
+                    token_refreshed = True
+                    continue
+
+                # Handle "continue wait" responses
+                if result.get("error") == "Continue wait":
+                    elapsed = time.time() - request_time
+                    if elapsed > self.max_wait_time:
+                        self.logger.error(f"Request timed out after {self.max_wait_time} seconds")
+                        return {
+                            "error": "Request timed out. Something may have gone wrong or the request may be too complex."
+                        }
+                    # Exponential backoff capped by the time left, with jitter so concurrent
+                    # polls spread out; the [0.5, 1] range keeps successive delays non-decreasing
+                    delay = min(self.max_wait_time - elapsed, self.request_backoff * 2**attempt)
+                    delay *= random.uniform(0.5, 1.0)
+                    attempt += 1
+                    self.logger.warning(
+                        f"Request incomplete, polling again in {delay:.2f} second(s)"
+                    )
+                    time.sleep(delay)
+                    continue
+
+                if response.status_code != 200:
+                    self.logger.error(f"Request failed with error: {str(result.get('error'))}")
+
+                return result
 
         except Exception as e:
             self.logger.error(f"Request failed with error: {str(e)}")
             return {"error": f"Request failed: {str(e)}"}
 
     def describe(self) -> dict[str, Any]:
-        return self._request("meta")
+        # Cube metadata rarely changes, so reuse it for meta_ttl seconds
+        cached_at, meta = self._meta_cache
+        now = time.monotonic()
+        if meta is not None and now - cached_at < self.meta_ttl:
+            return meta
+        meta = self._request("meta")
+        if "error" not in meta:
+            self._meta_cache = (now, meta)
+        return meta
 
     def _cast_numerics(self, response: dict[str, Any]) -> dict[str, Any]:
         if response.get("data") and response.get("annotation"):
+            annotation = response["annotation"]
             # Find which keys are numeric
-            numeric_keys = set()
-            dimensions_and_measures = dict(
-                response["annotation"].get("dimensions", {}),
-                **response["annotation"].get("measures", []),
-            )
-            for column_name, column in dimensions_and_measures.items():
-                if column.get("type") == "number":
-                    numeric_keys.add(column_name)
-            # Cast numeric values to numbers
-            for row in response["data"]:
-                for key in numeric_keys:
-                    try:
-                        row[key] = float(row[key])
-                        if row[key].is_integer():
-                            row[key] = int(row[key])
-                    except (ValueError, TypeError):
-                        pass
+            numeric_keys = [
+                column_name
+                for column_name, column in chain(
+                    annotation.get("dimensions", {}).items(),
+                    annotation.get("measures", {}).items(),
+                )
+                if column.get("type") == "number"
+            ]
+            if not numeric_keys:
+                return response
+            # Cast numeric values to numbers, one column at a time
+            rows = response["data"]
+            for key in numeric_keys:
+                column = [row.get(key) for row in rows]
+                # Columns of plain integer strings (counts, ids) skip the per-cell fallbacks
+                if all(isinstance(value, str) and value.isdecimal() for value in column):
+                    cast_column = map(int, column)
+                else:
+                    cast_column = map(to_number, column)
+                for row, value in zip(rows, cast_column, strict=True):
+                    if value is not None:
+                        row[key] = value
         return response
 
     def query(self, query: dict[str, Any], cast_numerics: bool = True) -> dict[str, Any]:
+        # Repeated tool calls often ask for the same query, so serve recent results from memory
+        key = (_query_cache_key(query), cast_numerics)
+        with self._query_cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.query_cache_ttl:
+                self._query_cache.move_to_end(key)
+                return copy.deepcopy(cached[1])
+
         response = self._request("load", query=query)
         if cast_numerics:
             response = self._cast_numerics(response)
+        if "error" not in response:
+            # Cache a private copy so callers are free to mutate the response they get back
+            entry = (time.monotonic(), copy.deepcopy(response))
+            with self._query_cache_lock:
+                self._query_cache[key] = entry
+                self._query_cache.move_to_end(key)
+                if len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
         return response
 
+    def close(self) -> None:
+        """Release the pooled connections held by the session."""
+        self.session.close()
 
-class TimeFilter(BaseModel):
-    dimension: str = Field(..., description="Name of the time dimension")
-    granularity: Literal["second", "minute", "hour", "day", "week", "month", "quarter", "year"] = (
-        Field(..., description="Time granularity")
-    )
-    dateRange: list[str] | str = Field(
-        ...,
-        description="Pair of dates ISO dates representing the start and end of the range. Alternatively, a string representing a relative date range of the form: 'last N days', 'today', 'yesterday', 'last year', etc.",
-    )
+    def __enter__(self) -> Self:
+        return self
 
-    model_config = {"extra": "forbid"}
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
 
 
 class FilterValue(BaseModel):
     member: str = Field(..., description="Member to filter on")
     values: list[str] = Field(..., description="Values to include in the filter")
 
-    model_config = {"extra": "forbid"}
+    model_config = {"extra": "forbid", "frozen": True, "defer_build": True}
 
 
 class Filter(BaseModel):
@@ -155,7 +321,7 @@ class Filter(BaseModel):
         None, description="Values for the filter"
     )
 
-    model_config = {"extra": "forbid"}
+    model_config = {"extra": "forbid", "frozen": True, "defer_build": True}
 
 
 class TimeDimension(BaseModel):
@@ -168,7 +334,11 @@ class TimeDimension(BaseModel):
         description="Pair of dates ISO dates representing the start and end of the range. Alternatively, a string representing a relative date range of the form: 'last N days', 'today', 'yesterday', 'last year', etc.",
     )
 
-    model_config = {"extra": "forbid"}
+    model_config = {"extra": "forbid", "frozen": True, "defer_build": True}
+
+
+# Time filters share the TimeDimension shape, so reuse its compiled model
+TimeFilter = TimeDimension
 
 
 class Query(BaseModel):
@@ -187,22 +357,32 @@ class Query(BaseModel):
         description="Return results without grouping by dimensions. Instead, return all rows. This can be useful for fetching a single row by its ID as well.",
     )
 
-    model_config = {"extra": "forbid"}
+    model_config = {"extra": "forbid", "frozen": True, "defer_build": True}
+
+    def to_cube_dict(self) -> dict[str, Any]:
+        """Serialize to the query shape sent to Cube's /load endpoint."""
+        return self.model_dump(by_alias=True, exclude_none=True)
 
 
 def main(credentials: dict[str, Any], logger: logging.Logger) -> None:
     mcp = FastMCP("Cube.dev")
 
     client = CubeClient(**credentials, logger=logger)
+    # The rendered description is reused for as long as the client serves cached metadata
+    described_meta: dict[str, Any] | None = None
+    description_text = ""
 
     @mcp.resource("context://data_description")
-    def data_description() -> str:
+    async def data_description() -> str:
         """Describe the data available in Cube."""
-        meta = client.describe()
+        nonlocal described_meta, description_text
+        meta = await asyncio.to_thread(client.describe)
         if error := meta.get("error"):
             logger.error("Error in data_description: %s\n\n%s", error, meta.get("stack"))
-            logger.error("Full response: %s", json.dumps(meta))
+            logger.error("Full response: %s", LazyJson(meta))
             return f"Error: Description of the data is not available: {error}, {meta}"
+        if meta is described_meta:
+            return description_text
 
         description = [
             {
@@ -212,7 +392,7 @@ def main(credentials: dict[str, Any], logger: logging.Logger) -> None:
                 "dimensions": [
                     {
                         "name": dimension.get("name"),
-                        "title": dimension.get("shortTitle") or dimension.get("title"),
+                        "title": _pick_title(dimension),
                         "description": dimension.get("description"),
                     }
                     for dimension in cube.get("dimensions", [])
@@ -220,7 +400,7 @@ def main(credentials: dict[str, Any], logger: logging.Logger) -> None:
                 "measures": [
                     {
                         "name": measure.get("name"),
-                        "title": measure.get("shortTitle") or measure.get("title"),
+                        "title": _pick_title(measure),
                         "description": measure.get("description"),
                     }
                     for measure in cube.get("measures", [])
@@ -228,36 +408,44 @@ def main(credentials: dict[str, Any], logger: logging.Logger) -> None:
             }
             for cube in meta.get("cubes", [])
         ]
-        return (
-            "Here is a description of the data available via the read_data tool:\n\n"
-            + yaml.dump(description, indent=2, sort_keys=True)
-        )
+        described_meta = meta
+        description_text = _DATA_DESC_PREFIX + _dump_yaml(description, sort_keys=True)
+        return description_text
 
     @mcp.tool("describe_data")
-    def describe_data() -> dict[str, str]:
+    async def describe_data() -> dict[str, str]:
         """Describe the data available in Cube."""
-        return {"type": "text", "text": data_description()}
+        return {"type": "text", "text": await data_description()}
+
+    # read_data results, served through a single templated resource instead of one per call
+    data_store: dict[str, str] = {}
+
+    @mcp.resource("data://{data_id}")
+    def data_resource(data_id: str) -> str:
+        """Rows returned by an earlier read_data call, as JSON."""
+        if (data_json := data_store.get(data_id)) is None:
+            raise ValueError(f"Unknown data id: {data_id}")
+        return data_json
 
     @mcp.tool("read_data")
-    def read_data(query: Query) -> str | list[TextContent | EmbeddedResource]:
+    async def read_data(query: Query) -> str | list[TextContent | EmbeddedResource]:
         """Read data from Cube."""
         try:
-            query_dict = query.model_dump(by_alias=True, exclude_none=True)
-            logger.info("read_data called with query: %s", json.dumps(query_dict))
-            response = client.query(query_dict)
+            query_dict = query.to_cube_dict()
+            logger.info("read_data called with query: %s", LazyJson(query_dict))
+            # Run the blocking request in a worker thread so other calls are not stalled
+            response = await asyncio.to_thread(client.query, query_dict)
             if error := response.get("error"):
                 logger.error("Error in read_data: %s\n\n%s", error, response.get("stack"))
-                logger.error("Full response: %s", json.dumps(response))
+                logger.error("Full response: %s", LazyJson(response))
                 return f"Error: {error}"
             data = response.get("data", [])
             logger.info("read_data returned %s rows", len(data))
 
-            data_id = str(uuid.uuid4())
-
-            @mcp.resource(f"data://{data_id}")
-            def data_resource() -> str:
-                return json.dumps(data)
-
+            data_id = secrets.token_hex(16)
+            # Serialize the rows once; the resource and the embedded document both reuse it
+            data_json = to_json(data)
+            data_store[data_id] = data_json
             logger.info("Added results as resource with ID: %s", data_id)
 
             output = {
@@ -266,7 +454,7 @@ def main(credentials: dict[str, Any], logger: logging.Logger) -> None:
                 "data": data,
             }
             yaml_output = data_to_yaml(output)
-            json_output = json.dumps(output)
+            json_output = f'{{"type":"data","data_id":{to_json(data_id)},"data":{data_json}}}'
             return [
                 TextContent(type="text", text=yaml_output),
                 EmbeddedResource(
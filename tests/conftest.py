@@ -2,10 +2,10 @@
 
 from collections.abc import Generator
 from typing import Any
+from unittest.mock import create_autospec
 
 import pytest
 import responses
-from mcp.server.fastmcp import FastMCP
 
 from mcp_cube_server.server import CubeClient
 
@@ -28,9 +28,9 @@ def mock_token_payload() -> dict[str, Any]:
     return {"user_id": "test-user", "role": "admin"}
 
 
-@pytest.fixture
-def mock_meta_response() -> dict[str, Any]:
-    """Mock Cube.dev meta API response."""
+@pytest.fixture(scope="session")
+def meta_response_template() -> dict[str, Any]:
+    """Mock Cube.dev meta API response, built once per session. Do not mutate."""
     return {
         "cubes": [
             {
@@ -77,8 +77,14 @@ def mock_meta_response() -> dict[str, Any]:
 
 
 @pytest.fixture
-def mock_query_response() -> dict[str, Any]:
-    """Mock Cube.dev query response."""
+def mock_meta_response(meta_response_template: dict[str, Any]) -> dict[str, Any]:
+    """Mock Cube.dev meta API response, shared with the session template. Do not mutate."""
+    return meta_response_template
+
+
+@pytest.fixture(scope="session")
+def query_response_template() -> dict[str, Any]:
+    """Mock Cube.dev query response, built once per session. Do not mutate."""
     return {
         "data": [
             {"Orders.status": "completed", "Orders.count": "42", "Orders.total_amount": "1234.56"},
@@ -94,6 +100,12 @@ def mock_query_response() -> dict[str, Any]:
     }
 
 
+@pytest.fixture
+def mock_query_response(query_response_template: dict[str, Any]) -> dict[str, Any]:
+    """Mock Cube.dev query response, shared with the session template. Do not mutate."""
+    return query_response_template
+
+
 @pytest.fixture
 def mock_logger(mocker) -> Any:
     """Mock logger for testing."""
@@ -129,21 +141,28 @@ def cube_client(
 
 
 @pytest.fixture
-def mcp_server() -> FastMCP:
-    """Create a FastMCP server instance for testing."""
-    return FastMCP("Test Cube Server")
+def mock_cube_client() -> Any:
+    """CubeClient double that only accepts the real client's attributes and signatures."""
+    return create_autospec(CubeClient, instance=True)
 
 
 @pytest.fixture
+def mocked_responses() -> Generator[responses.RequestsMock, None, None]:
+    """Mock the HTTP layer for a single test; every route the test registers must be called."""
+    with responses.RequestsMock() as rsps:
+        yield rsps
+
+
+@pytest.fixture(scope="session")
 def mock_error_response() -> dict[str, Any]:
-    """Mock error response from Cube.dev."""
+    """Mock error response from Cube.dev, built once per session. Do not mutate."""
     return {
         "error": "Query execution error",
         "stack": "Error: Query execution failed\n    at QueryEngine.execute",
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_continue_wait_response() -> dict[str, Any]:
-    """Mock 'continue wait' response from Cube.dev."""
+    """Mock 'continue wait' response from Cube.dev, built once per session. Do not mutate."""
     return {"error": "Continue wait"}
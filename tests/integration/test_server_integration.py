@@ -1,12 +1,118 @@
 """Integration tests for the MCP server."""
 
+import logging
+import os
+import sys
+from collections.abc import Generator
+from pathlib import Path
 from typing import Any
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 
 import pytest
 import responses
 
+from mcp_cube_server import _ENV_VARS, _load_dotenv, server
 from mcp_cube_server import main as cli_main
+from mcp_cube_server.server import CubeClient, Query
+
+pytestmark = pytest.mark.integration
+
+CUBE_ENDPOINT = "https://cube.example.com"
+
+# The client only logs through this; a real logger is far cheaper than a Mock
+_LOGGER = logging.getLogger(__name__)
+_LOGGER.addHandler(logging.NullHandler())
+
+_QUERY_DUMP = Query(measures=["Orders.count"], dimensions=["Orders.status"]).model_dump()
+
+
+@pytest.fixture(scope="module")
+def cube_api(
+    meta_response_template: dict[str, Any],
+    query_response_template: dict[str, Any],
+) -> Generator[responses.RequestsMock, None, None]:
+    """Mock Cube API with the meta and load routes registered once per module."""
+    with responses.RequestsMock() as rsps:
+        rsps.add(responses.GET, f"{CUBE_ENDPOINT}/meta", json=meta_response_template, status=200)
+        rsps.add(responses.GET, f"{CUBE_ENDPOINT}/load", json=query_response_template, status=200)
+        yield rsps
+
+
+@pytest.fixture
+def mocked_cube_api(cube_api: responses.RequestsMock) -> responses.RequestsMock:
+    """The module's mock Cube API with the call history cleared for this test."""
+    cube_api.calls.reset()
+    return cube_api
+
+
+@pytest.fixture(scope="module")
+def integration_client(cube_api: responses.RequestsMock) -> CubeClient:  # noqa: ARG001
+    """CubeClient shared by the module, built while the mock API serves /meta."""
+    return CubeClient(
+        endpoint=CUBE_ENDPOINT,
+        api_secret="secret",
+        token_payload={},
+        logger=_LOGGER,
+    )
+
+
+def assert_credentials(mock_main: Mock, **expected: Any) -> None:
+    """Assert that the server entry point received credentials containing ``expected``."""
+    credentials = mock_main.call_args.args[0]
+    for key, value in expected.items():
+        assert credentials[key] == value, (key, credentials.get(key), value)
+
+
+# (id, argv, whether the CUBE_* environment is set, expected credentials)
+CLI_CASES = (
+    (
+        "environment",
+        ("mcp_cube_server",),
+        True,
+        {
+            "endpoint": "https://cube.example.com/cubejs-api/v1",
+            "api_secret": "test-secret-key",
+            "token_payload": {"user_id": "test-user"},
+        },
+    ),
+    (
+        "command_line_args",
+        (
+            "mcp_cube_server",
+            "--endpoint",
+            "https://cli.example.com",
+            "--api_secret",
+            "cli-secret",
+            "--log_level",
+            "DEBUG",
+        ),
+        False,
+        {"endpoint": "https://cli.example.com", "api_secret": "cli-secret"},
+    ),
+    (
+        "additional_token_payload_args",
+        ("mcp_cube_server", "--role", "admin", "--tenant_id", "tenant-123"),
+        True,
+        # Original payload should be extended
+        {"token_payload": {"user_id": "test-user", "role": "admin", "tenant_id": "tenant-123"}},
+    ),
+    (
+        "logging_to_file",
+        (
+            "mcp_cube_server",
+            "--endpoint",
+            "https://cube.example.com",
+            "--api_secret",
+            "secret",
+            "--log_dir",
+            "{log_dir}",
+        ),
+        False,
+        {"endpoint": "https://cube.example.com", "api_secret": "secret"},
+    ),
+)
+
+CLI_CASE_IDS = tuple(case[0] for case in CLI_CASES)
 
 
 class TestServerIntegration:
@@ -14,186 +120,127 @@ class TestServerIntegration:
 
     @pytest.fixture
     def mock_env(self, monkeypatch) -> None:
-        """Set up mock environment variables."""
+        """Set up mock environment variables for a single test."""
         monkeypatch.setenv("CUBE_ENDPOINT", "https://cube.example.com/cubejs-api/v1")
         monkeypatch.setenv("CUBE_API_SECRET", "test-secret-key")
         monkeypatch.setenv("CUBE_TOKEN_PAYLOAD", '{"user_id": "test-user"}')
 
-    @patch("mcp_cube_server.server.FastMCP")
-    def test_full_server_initialization_flow(
-        self,
-        mock_fastmcp_class: Mock,
-        mock_env: None,  # noqa: ARG002
-    ) -> None:
-        """Test complete server initialization flow."""
-        mock_mcp = Mock()
-        mock_fastmcp_class.return_value = mock_mcp
-
-        with (
-            patch("sys.argv", ["mcp_cube_server"]),
-            patch("mcp_cube_server.server.main") as mock_server_main,
-        ):
-            cli_main()
-
-            # Verify server main was called with correct credentials
-            mock_server_main.assert_called_once()
-            credentials = mock_server_main.call_args[0][0]
-
-            assert credentials["endpoint"] == "https://cube.example.com/cubejs-api/v1"
-            assert credentials["api_secret"] == "test-secret-key"
-            assert credentials["token_payload"] == {"user_id": "test-user"}
+    @pytest.fixture
+    def mock_server_main(self, monkeypatch) -> Mock:
+        """Replace the server entry point so the CLI never starts a real server."""
+        mock_main = Mock()
+        monkeypatch.setattr(server, "main", mock_main)
+        return mock_main
 
-    @patch("mcp_cube_server.server.FastMCP")
-    def test_cli_with_command_line_args(
+    @pytest.fixture
+    def cli_env(self, request, mock_server_main: Mock, monkeypatch) -> Mock:
+        """Run the CLI with the parametrized argv; returns the stubbed server entry point."""
+        argv = list(request.param)
+        if "--log_dir" in argv:
+            # Only the logging case needs a real directory on disk
+            log_dir = request.getfixturevalue("tmp_path") / "logs"
+            log_dir.mkdir()
+            argv = [arg.format(log_dir=log_dir) for arg in argv]
+        monkeypatch.setattr(sys, "argv", argv)
+        return mock_server_main
+
+    @pytest.mark.parametrize(
+        ("cli_env", "use_env", "expected"),
+        [case[1:] for case in CLI_CASES],
+        ids=CLI_CASE_IDS,
+        indirect=["cli_env"],
+    )
+    def test_cli_credentials(
         self,
-        mock_fastmcp_class: Mock,
+        cli_env: Mock,
+        use_env: bool,
+        expected: dict[str, Any],
+        request,
+        monkeypatch,
     ) -> None:
-        """Test CLI with command line arguments overriding env vars."""
-        mock_mcp = Mock()
-        mock_fastmcp_class.return_value = mock_mcp
-
-        with (
-            patch(
-                "sys.argv",
-                [
-                    "mcp_cube_server",
-                    "--endpoint",
-                    "https://cli.example.com",
-                    "--api_secret",
-                    "cli-secret",
-                    "--log_level",
-                    "DEBUG",
-                ],
-            ),
-            patch("mcp_cube_server.server.main") as mock_server_main,
-        ):
-            cli_main()
-
-            credentials = mock_server_main.call_args[0][0]
-
-            assert credentials["endpoint"] == "https://cli.example.com"
-            assert credentials["api_secret"] == "cli-secret"
-
-    @patch("mcp_cube_server.server.FastMCP")
-    def test_cli_with_additional_token_payload_args(
+        """Test that CLI arguments and environment variables become server credentials."""
+        if use_env:
+            request.getfixturevalue("mock_env")
+        else:
+            # The CLI-only cases must exercise the --endpoint/--api_secret required path
+            for name in _ENV_VARS:
+                monkeypatch.delenv(name, raising=False)
+            monkeypatch.setattr("dotenv.load_dotenv", Mock())
+            assert not any(os.getenv(name) for name in _ENV_VARS)
+
+        cli_main()
+
+        cli_env.assert_called_once()
+        assert_credentials(cli_env, **expected)
+        if "--log_dir" in sys.argv:
+            log_dir = Path(sys.argv[sys.argv.index("--log_dir") + 1])
+            assert (log_dir / "mcp_cube_server.log").exists()
+
+    def test_dotenv_skipped_when_env_populated(
         self,
-        mock_fastmcp_class: Mock,
+        mock_server_main: Mock,  # noqa: ARG002
         mock_env: None,  # noqa: ARG002
+        monkeypatch,
     ) -> None:
-        """Test CLI with additional token payload arguments."""
-        mock_mcp = Mock()
-        mock_fastmcp_class.return_value = mock_mcp
-
-        with (
-            patch(
-                "sys.argv",
-                [
-                    "mcp_cube_server",
-                    "--role",
-                    "admin",
-                    "--tenant_id",
-                    "tenant-123",
-                ],
-            ),
-            patch("mcp_cube_server.server.main") as mock_server_main,
-        ):
-            cli_main()
+        """Test that the .env search is skipped when all variables are already set."""
+        mock_load_dotenv = Mock()
+        monkeypatch.setattr("dotenv.load_dotenv", mock_load_dotenv)
+        monkeypatch.setattr(sys, "argv", ["mcp_cube_server"])
 
-            credentials = mock_server_main.call_args[0][0]
+        _load_dotenv.cache_clear()
+        cli_main()
 
-            # Original payload should be extended
-            assert credentials["token_payload"]["user_id"] == "test-user"
-            assert credentials["token_payload"]["role"] == "admin"
-            assert credentials["token_payload"]["tenant_id"] == "tenant-123"
+        mock_load_dotenv.assert_not_called()
 
-    def test_cli_with_invalid_json_token_payload(self, capsys, monkeypatch) -> None:
+    def test_dotenv_loaded_once_per_process(
+        self,
+        mock_server_main: Mock,  # noqa: ARG002
+        monkeypatch,
+    ) -> None:
+        """Test that repeated invocations only search for .env once."""
+        mock_load_dotenv = Mock()
+        monkeypatch.setattr("dotenv.load_dotenv", mock_load_dotenv)
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            ["mcp_cube_server", "--endpoint", "https://cube.example.com", "--api_secret", "s"],
+        )
+
+        _load_dotenv.cache_clear()
+        cli_main()
+        cli_main()
+        _load_dotenv.cache_clear()
+
+        mock_load_dotenv.assert_called_once()
+
+    def test_cli_with_invalid_json_token_payload(self, caplog, monkeypatch) -> None:
         """Test CLI with invalid JSON in token payload."""
         monkeypatch.setenv("CUBE_ENDPOINT", "https://cube.example.com")
         monkeypatch.setenv("CUBE_API_SECRET", "secret")
         monkeypatch.setenv("CUBE_TOKEN_PAYLOAD", "invalid-json{")
+        monkeypatch.setattr(sys, "argv", ["mcp_cube_server"])
 
-        with patch("sys.argv", ["mcp_cube_server"]):
-            cli_main()
-
-            captured = capsys.readouterr()
-            # Check stdout or stderr
-            output = captured.out + captured.err
-            assert "Invalid JSON in token_payload" in output
-
-    @patch("mcp_cube_server.server.FastMCP")
-    def test_server_with_logging_to_file(
-        self,
-        mock_fastmcp_class: Mock,
-        tmp_path,
-    ) -> None:
-        """Test server with file logging enabled."""
-        mock_mcp = Mock()
-        mock_fastmcp_class.return_value = mock_mcp
-
-        log_dir = tmp_path / "logs"
-        log_dir.mkdir()
-
-        with (
-            patch(
-                "sys.argv",
-                [
-                    "mcp_cube_server",
-                    "--endpoint",
-                    "https://cube.example.com",
-                    "--api_secret",
-                    "secret",
-                    "--log_dir",
-                    str(log_dir),
-                ],
-            ),
-            patch("mcp_cube_server.server.main"),
-        ):
+        # The package logger does not propagate, so attach caplog's handler directly
+        logger = logging.getLogger("mcp_cube_server")
+        caplog.set_level(logging.ERROR, logger="mcp_cube_server")
+        logger.addHandler(caplog.handler)
+        try:
             cli_main()
+        finally:
+            logger.removeHandler(caplog.handler)
 
-            # Check that log file would be created
-            _ = log_dir / "mcp_cube_server.log"
+        assert "Invalid JSON in token_payload" in caplog.text
 
     def test_query_flow_integration(
         self,
-        mock_meta_response: dict[str, Any],
-        mock_query_response: dict[str, Any],
+        integration_client: CubeClient,
+        mocked_cube_api: responses.RequestsMock,
     ) -> None:
         """Test complete query flow from request to response."""
-        from mcp_cube_server.server import CubeClient, Query
-
-        with responses.RequestsMock() as rsps:
-            # Mock meta endpoint
-            rsps.add(
-                responses.GET,
-                "https://cube.example.com/meta",
-                json=mock_meta_response,
-                status=200,
-            )
-
-            # Mock query endpoint
-            rsps.add(
-                responses.GET,
-                "https://cube.example.com/load",
-                json=mock_query_response,
-                status=200,
-            )
-
-            # Create client
-            client = CubeClient(
-                endpoint="https://cube.example.com",
-                api_secret="secret",
-                token_payload={},
-                logger=Mock(),
-            )
-
-            # Execute query
-            query = Query(
-                measures=["Orders.count"],
-                dimensions=["Orders.status"],
-            )
-
-            result = client.query(query.model_dump())
-
-            # Verify numeric casting happened
-            assert result["data"][0]["Orders.count"] == 42
-            assert result["data"][0]["Orders.total_amount"] == 1234.56
+        result = integration_client.query(_QUERY_DUMP)
+
+        # Verify numeric casting happened
+        assert result["data"][0]["Orders.count"] == 42
+        assert result["data"][0]["Orders.total_amount"] == 1234.56
+        # Metadata was fetched when the shared client was built, so only /load is hit
+        assert [call.request.path_url.split("?")[0] for call in mocked_cube_api.calls] == ["/load"]
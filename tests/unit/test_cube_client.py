@@ -1,5 +1,6 @@
 """Unit tests for CubeClient class."""
 
+import copy
 from typing import Any
 from unittest.mock import Mock
 
@@ -20,28 +21,28 @@ class TestCubeClient:
         mock_token_payload: dict[str, Any],
         mock_logger: Mock,
         mock_meta_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test successful CubeClient initialization."""
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/meta",
-                json=mock_meta_response,
-                status=200,
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/meta",
+            json=mock_meta_response,
+            status=200,
+        )
 
-            client = CubeClient(
-                endpoint=mock_cube_endpoint,
-                api_secret=mock_api_secret,
-                token_payload=mock_token_payload,
-                logger=mock_logger,
-            )
+        client = CubeClient(
+            endpoint=mock_cube_endpoint,
+            api_secret=mock_api_secret,
+            token_payload=mock_token_payload,
+            logger=mock_logger,
+        )
 
-            assert client.endpoint == mock_cube_endpoint
-            assert client.api_secret == mock_api_secret
-            assert client.token_payload == mock_token_payload
-            assert client.token is not None
-            assert client.meta == mock_meta_response
+        assert client.endpoint == mock_cube_endpoint
+        assert client.api_secret == mock_api_secret
+        assert client.token_payload == mock_token_payload
+        assert client.token is not None
+        assert client.meta == mock_meta_response
 
     def test_init_with_trailing_slash(
         self,
@@ -50,26 +51,26 @@ class TestCubeClient:
         mock_token_payload: dict[str, Any],
         mock_logger: Mock,
         mock_meta_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test CubeClient initialization with trailing slash in endpoint."""
         endpoint_with_slash = f"{mock_cube_endpoint}/"
 
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/meta",
-                json=mock_meta_response,
-                status=200,
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/meta",
+            json=mock_meta_response,
+            status=200,
+        )
 
-            client = CubeClient(
-                endpoint=endpoint_with_slash,
-                api_secret=mock_api_secret,
-                token_payload=mock_token_payload,
-                logger=mock_logger,
-            )
+        client = CubeClient(
+            endpoint=endpoint_with_slash,
+            api_secret=mock_api_secret,
+            token_payload=mock_token_payload,
+            logger=mock_logger,
+        )
 
-            assert client.endpoint == endpoint_with_slash
+        assert client.endpoint == endpoint_with_slash
 
     def test_generate_token(self, cube_client: CubeClient) -> None:
         """Test JWT token generation."""
@@ -82,38 +83,76 @@ class TestCubeClient:
             algorithms=["HS256"],
         )
 
-        assert decoded == cube_client.token_payload
+        assert decoded.items() >= cube_client.token_payload.items()
+        assert decoded["exp"] == cube_client._token_exp
+        assert jwt.get_unverified_header(token) == {"alg": "HS256", "typ": "JWT"}
+
+    def test_generate_token_keeps_explicit_exp(self, cube_client: CubeClient) -> None:
+        """Test that an exp claim in the configured payload is not overridden."""
+        cube_client.token_payload = {**cube_client.token_payload, "exp": 4102444800}
+        token = cube_client._generate_token()
+
+        decoded = jwt.decode(token, cube_client.api_secret, algorithms=["HS256"])
+
+        assert decoded["exp"] == 4102444800
+        assert cube_client._token_exp == 4102444800
 
     def test_refresh_token(self, cube_client: CubeClient) -> None:
         """Test token refresh mechanism."""
-        old_token = cube_client.token
         cube_client._refresh_token()
 
         assert cube_client.token is not None
-        # Tokens should be different due to timestamp
-        assert cube_client.token == old_token  # Same payload produces same token
+        decoded = jwt.decode(cube_client.token, cube_client.api_secret, algorithms=["HS256"])
+        assert decoded["exp"] == cube_client._token_exp
+
+    def test_token_reused_until_expiry(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that the token is reused while valid and refreshed before it expires."""
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
+
+        token = cube_client.token
+        cube_client._request("load", query={"measures": ["Orders.count"]})
+        assert cube_client.token == token
+
+        # Pretend the token is about to expire
+        cube_client.token = "stale-token"
+        cube_client._token_exp = 0.0
+        cube_client._request("load", query={"measures": ["Orders.count"]})
+
+        assert cube_client.token != "stale-token"
+        assert mocked_responses.calls[-1].request.headers["Authorization"] == cube_client.token
 
     def test_request_success(
         self,
         cube_client: CubeClient,
         mock_cube_endpoint: str,
         mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test successful API request."""
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json=mock_query_response,
-                status=200,
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client._request("load", query=query)
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
 
-            assert result == mock_query_response
-            assert len(rsps.calls) == 1
-            assert rsps.calls[0].request.headers["Authorization"] == cube_client.token
+        assert result == mock_query_response
+        assert len(mocked_responses.calls) == 1
+        assert mocked_responses.calls[0].request.headers["Authorization"] == cube_client.token
 
     def test_request_with_continue_wait(
         self,
@@ -121,146 +160,275 @@ class TestCubeClient:
         mock_cube_endpoint: str,
         mock_continue_wait_response: dict[str, Any],
         mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test request handling with 'Continue wait' response."""
         cube_client.request_backoff = 0.1  # Speed up test
 
-        with responses.RequestsMock() as rsps:
-            # First response: Continue wait
-            rsps.add(
+        # First response: Continue wait
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_continue_wait_response,
+            status=200,
+        )
+        # Second response: Success
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
+
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
+
+        assert result == mock_query_response
+        assert len(mocked_responses.calls) == 2
+        assert mocked_responses.calls[0].request.params == {
+            "query": '{"measures":["Orders.count"]}'
+        }
+        assert mocked_responses.calls[1].request.params == mocked_responses.calls[0].request.params
+
+    def test_request_continue_wait_backs_off_exponentially(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_continue_wait_response: dict[str, Any],
+        mock_query_response: dict[str, Any],
+        mocker,
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that successive 'Continue wait' polls wait progressively longer."""
+        mock_sleep = mocker.patch("mcp_cube_server.server.time.sleep")
+
+        for _ in range(4):
+            mocked_responses.add(
                 responses.GET,
                 f"{mock_cube_endpoint}/load",
                 json=mock_continue_wait_response,
                 status=200,
             )
-            # Second response: Success
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json=mock_query_response,
-                status=200,
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client._request("load", query=query)
+        result = cube_client._request("load", query={"measures": ["Orders.count"]})
 
-            assert result == mock_query_response
-            assert len(rsps.calls) == 2
+        assert result == mock_query_response
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        assert len(delays) == 4
+        assert delays == sorted(delays)
+        assert all(0 < delay <= cube_client.max_wait_time for delay in delays)
 
     def test_request_timeout_on_continue_wait(
         self,
         cube_client: CubeClient,
         mock_cube_endpoint: str,
         mock_continue_wait_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test request timeout when receiving continuous 'Continue wait' responses."""
         cube_client.request_backoff = 0.1
         cube_client.max_wait_time = 0.2
 
-        with responses.RequestsMock() as rsps:
-            # Always return Continue wait
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json=mock_continue_wait_response,
-                status=200,
-            )
+        # Always return Continue wait
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_continue_wait_response,
+            status=200,
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client._request("load", query=query)
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
 
-            assert "error" in result
-            assert "timed out" in result["error"]
+        assert "error" in result
+        assert "timed out" in result["error"]
 
     def test_request_with_403_refresh(
         self,
         cube_client: CubeClient,
         mock_cube_endpoint: str,
         mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test automatic token refresh on 403 response."""
-        with responses.RequestsMock() as rsps:
-            # First response: 403
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json={"error": "Unauthorized"},
-                status=403,
-            )
-            # Second response after refresh: Success
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json=mock_query_response,
-                status=200,
-            )
+        # First response: 403
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json={"error": "Unauthorized"},
+            status=403,
+        )
+        # Second response after refresh: Success
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
+
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
+
+        assert result == mock_query_response
+        assert len(mocked_responses.calls) == 2
+        assert mocked_responses.calls[1].request.headers["Authorization"] == cube_client.token
+        cube_client.logger.warning.assert_called_with("Received 403, attempting token refresh")
+
+    def test_request_with_403_then_continue_wait(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_continue_wait_response: dict[str, Any],
+        mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that polling continues after a token refresh."""
+        cube_client.request_backoff = 0.1
+
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json={"error": "Unauthorized"},
+            status=403,
+        )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_continue_wait_response,
+            status=200,
+        )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client._request("load", query=query)
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
 
-            assert result == mock_query_response
-            assert len(rsps.calls) == 2
-            cube_client.logger.warning.assert_called_with("Received 403, attempting token refresh")
+        assert result == mock_query_response
+        assert len(mocked_responses.calls) == 3
+
+    def test_request_with_repeated_403(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that the token is only refreshed once per request."""
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json={"error": "Unauthorized"},
+            status=403,
+        )
+
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
+
+        assert result == {"error": "Unauthorized"}
+        assert len(mocked_responses.calls) == 2
+        cube_client.logger.error.assert_called()
 
     def test_request_non_200_status(
         self,
         cube_client: CubeClient,
         mock_cube_endpoint: str,
         mock_error_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test handling of non-200 status codes."""
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json=mock_error_response,
-                status=500,
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_error_response,
+            status=500,
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client._request("load", query=query)
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
 
-            assert result == mock_error_response
-            cube_client.logger.error.assert_called()
+        assert result == mock_error_response
+        cube_client.logger.error.assert_called()
 
     def test_request_exception_handling(
         self,
         cube_client: CubeClient,
         mock_cube_endpoint: str,
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test exception handling during request."""
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                body=RequestException("Network error"),
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            body=RequestException("Network error"),
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client._request("load", query=query)
+        query = {"measures": ["Orders.count"]}
+        result = cube_client._request("load", query=query)
 
-            assert "error" in result
-            assert "Request failed" in result["error"]
-            cube_client.logger.error.assert_called()
+        assert "error" in result
+        assert "Request failed" in result["error"]
+        cube_client.logger.error.assert_called()
 
     def test_describe_method(
         self,
         cube_client: CubeClient,
         mock_cube_endpoint: str,
         mock_meta_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test describe method."""
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/meta",
-                json=mock_meta_response,
-                status=200,
-            )
+        cube_client.meta_ttl = 0  # Force a fresh request
+
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/meta",
+            json=mock_meta_response,
+            status=200,
+        )
+
+        result = cube_client.describe()
 
-            result = cube_client.describe()
+        assert result == mock_meta_response
 
-            assert result == mock_meta_response
+    def test_describe_uses_cached_meta(
+        self,
+        cube_client: CubeClient,
+        mock_meta_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that describe reuses the metadata fetched during initialization."""
+        result = cube_client.describe()
+
+        assert result == mock_meta_response
+        assert len(mocked_responses.calls) == 0
+
+    def test_describe_does_not_cache_errors(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_meta_response: dict[str, Any],
+        mock_error_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that an error response is not served from the metadata cache."""
+        cube_client._meta_cache = (0.0, None)
+
+        mocked_responses.add(responses.GET, f"{mock_cube_endpoint}/meta", json=mock_error_response)
+        mocked_responses.add(responses.GET, f"{mock_cube_endpoint}/meta", json=mock_meta_response)
+
+        assert cube_client.describe() == mock_error_response
+        assert cube_client.describe() == mock_meta_response
+        assert cube_client.describe() == mock_meta_response
+        assert len(mocked_responses.calls) == 2
 
     def test_cast_numerics_with_valid_data(
         self,
@@ -268,7 +436,8 @@ class TestCubeClient:
         mock_query_response: dict[str, Any],
     ) -> None:
         """Test numeric casting with valid data."""
-        response = cube_client._cast_numerics(mock_query_response.copy())
+        # _cast_numerics casts in place, so work on a copy of the shared payload
+        response = cube_client._cast_numerics(copy.deepcopy(mock_query_response))
 
         # Check that numeric strings are converted
         assert response["data"][0]["Orders.count"] == 42
@@ -288,11 +457,50 @@ class TestCubeClient:
             },
         }
 
-        result = cube_client._cast_numerics(response.copy())
+        result = cube_client._cast_numerics(response)
 
         # Should not raise exception, value remains as string
         assert result["data"][0]["amount"] == "not-a-number"
 
+    def test_cast_numerics_with_mixed_values(
+        self,
+        cube_client: CubeClient,
+    ) -> None:
+        """Test numeric casting with integer, float, exponent and missing values."""
+        response = {
+            "data": [
+                {"amount": "-7", "ratio": "1.0"},
+                {"amount": "1e3", "ratio": None},
+                {"ratio": "0.25"},
+            ],
+            "annotation": {
+                "measures": {"amount": {"type": "number"}},
+                "dimensions": {"ratio": {"type": "number"}},
+            },
+        }
+
+        result = cube_client._cast_numerics(response)
+
+        assert result["data"][0] == {"amount": -7, "ratio": 1}
+        assert result["data"][1] == {"amount": 1000, "ratio": None}
+        assert result["data"][2] == {"ratio": 0.25}
+
+    def test_cast_numerics_without_numeric_columns(
+        self,
+        cube_client: CubeClient,
+    ) -> None:
+        """Test that rows are left untouched when no column is numeric."""
+        data = [{"Orders.status": "42"}]
+        response = {
+            "data": data,
+            "annotation": {"dimensions": {"Orders.status": {"type": "string"}}},
+        }
+
+        result = cube_client._cast_numerics(response)
+
+        assert result["data"] is data
+        assert result["data"][0]["Orders.status"] == "42"
+
     def test_cast_numerics_without_annotation(
         self,
         cube_client: CubeClient,
@@ -300,7 +508,7 @@ class TestCubeClient:
         """Test numeric casting without annotation data."""
         response = {"data": [{"amount": "123"}]}
 
-        result = cube_client._cast_numerics(response.copy())
+        result = cube_client._cast_numerics(response)
 
         # Should not modify data without annotation
         assert result["data"][0]["amount"] == "123"
@@ -310,39 +518,137 @@ class TestCubeClient:
         cube_client: CubeClient,
         mock_cube_endpoint: str,
         mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test query method with successful response."""
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json=mock_query_response,
-                status=200,
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client.query(query)
+        query = {"measures": ["Orders.count"]}
+        result = cube_client.query(query)
 
-            # Check that numerics were cast
-            assert result["data"][0]["Orders.count"] == 42
+        # Check that numerics were cast
+        assert result["data"][0]["Orders.count"] == 42
 
     def test_query_method_without_numeric_casting(
         self,
         cube_client: CubeClient,
         mock_cube_endpoint: str,
         mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
     ) -> None:
         """Test query method without numeric casting."""
-        with responses.RequestsMock() as rsps:
-            rsps.add(
-                responses.GET,
-                f"{mock_cube_endpoint}/load",
-                json=mock_query_response,
-                status=200,
-            )
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
+
+        query = {"measures": ["Orders.count"]}
+        result = cube_client.query(query, cast_numerics=False)
+
+        # Check that numerics were not cast
+        assert result["data"][0]["Orders.count"] == "42"
+
+    def test_context_manager_closes_session(self, cube_client: CubeClient) -> None:
+        """Test that leaving the client's context closes its session."""
+        cube_client.session.close = Mock()
+
+        with cube_client as client:
+            assert client is cube_client
+            cube_client.session.close.assert_not_called()
+
+        cube_client.session.close.assert_called_once()
+
+    def test_query_serves_repeats_from_cache(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that a repeated query within the TTL does not hit the API again."""
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
+
+        first = cube_client.query({"measures": ["Orders.count"], "limit": 10})
+        second = cube_client.query({"limit": 10, "measures": ["Orders.count"]})
+
+        assert len(mocked_responses.calls) == 1
+        assert second == first
+        assert second is not first
+
+        cube_client.query_cache_ttl = 0
+        cube_client.query({"measures": ["Orders.count"], "limit": 10})
+        assert len(mocked_responses.calls) == 2
+
+    def test_query_does_not_cache_errors(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_error_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that failed queries are retried rather than served from the cache."""
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_error_response,
+            status=400,
+        )
+
+        cube_client.query({"measures": ["Orders.count"]})
+        cube_client.query({"measures": ["Orders.count"]})
+
+        assert len(mocked_responses.calls) == 2
+
+    def test_query_cache_keeps_order_sequence(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that queries differing only in the sequence of order keys are not conflated."""
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
+
+        cube_client.query({"measures": ["Orders.count"], "order": {"a": "asc", "b": "desc"}})
+        cube_client.query({"measures": ["Orders.count"], "order": {"b": "desc", "a": "asc"}})
+
+        assert len(mocked_responses.calls) == 2
+
+    def test_query_cache_isolated_from_caller_mutation(
+        self,
+        cube_client: CubeClient,
+        mock_cube_endpoint: str,
+        mock_query_response: dict[str, Any],
+        mocked_responses: responses.RequestsMock,
+    ) -> None:
+        """Test that mutating a fresh response does not change what the cache serves later."""
+        mocked_responses.add(
+            responses.GET,
+            f"{mock_cube_endpoint}/load",
+            json=mock_query_response,
+            status=200,
+        )
 
-            query = {"measures": ["Orders.count"]}
-            result = cube_client.query(query, cast_numerics=False)
+        first = cube_client.query({"measures": ["Orders.count"]})
+        first["data"][0]["Orders.count"] = -1
+        second = cube_client.query({"measures": ["Orders.count"]})
 
-            # Check that numerics were not cast
-            assert result["data"][0]["Orders.count"] == "42"
+        assert len(mocked_responses.calls) == 1
+        assert second["data"][0]["Orders.count"] == 42
@@ -120,12 +120,8 @@ class TestTimeFilter:
         assert f.dateRange == ["2024-01-01", "2024-01-31"]
 
     def test_time_filter_equals_time_dimension(self) -> None:
-        """Test that TimeFilter has same structure as TimeDimension."""
-        # Both should have same fields and validation
-        time_filter_fields = set(TimeFilter.model_fields.keys())
-        time_dim_fields = set(TimeDimension.model_fields.keys())
-
-        assert time_filter_fields == time_dim_fields
+        """Test that TimeFilter shares TimeDimension's model and validator."""
+        assert TimeFilter is TimeDimension
 
 
 class TestQuery:
@@ -231,3 +227,11 @@ class TestQuery:
         assert "measures" in dumped
         assert "limit" in dumped
         assert dumped["limit"] == 10
+        assert query.to_cube_dict() == dumped
+
+    def test_query_is_frozen(self) -> None:
+        """Test that a validated Query cannot be modified."""
+        query = Query(measures=["Orders.count"])
+
+        with pytest.raises(ValidationError):
+            query.limit = 10  # type: ignore[misc]
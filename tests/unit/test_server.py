@@ -1,13 +1,84 @@
 """Unit tests for MCP server endpoints."""
 
-import json
-import uuid
+import logging
+import os
+import secrets
+import subprocess
+import sys
+from pathlib import Path
 from typing import Any
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 
+import pytest
 import yaml
-
-from mcp_cube_server.server import Query, data_to_yaml, main
+from mcp.server.fastmcp import FastMCP
+from mcp.types import EmbeddedResource, TextContent, TextResourceContents
+
+import mcp_cube_server
+from mcp_cube_server import server
+from mcp_cube_server.server import (
+    _DATA_DESC_PREFIX,
+    LazyJson,
+    Query,
+    YamlDumper,
+    _pick_title,
+    data_to_yaml,
+    from_json,
+    main,
+    to_json,
+)
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # pragma: no cover - PyYAML built without libyaml
+    from yaml import SafeLoader as YamlLoader  # type: ignore[assignment]
+
+
+def _start_server(monkeypatch, client: Any) -> FastMCP:
+    """Run server.main against ``client`` and return the FastMCP it would have started."""
+    servers: list[FastMCP] = []
+
+    def run_spy(self: FastMCP) -> None:
+        servers.append(self)
+
+    monkeypatch.setattr(FastMCP, "run", run_spy)
+    monkeypatch.setattr(server, "CubeClient", Mock(return_value=client))
+    main({"endpoint": "https://cube.example.com", "api_secret": "secret"}, Mock())
+    return servers[0]
+
+
+@pytest.fixture(scope="module")
+def expected_data_description() -> str:
+    """Description rendered from the conftest meta response, built once per module."""
+    description = [
+        {
+            "name": "Orders",
+            "title": "Orders",
+            "description": "Order data",
+            "dimensions": [
+                {
+                    "name": "Orders.id",
+                    "title": "Order ID",
+                    "description": "Unique order identifier",
+                },
+                {"name": "Orders.status", "title": "Status", "description": "Order status"},
+                {
+                    "name": "Orders.created_at",
+                    "title": "Created At",
+                    "description": "Order creation timestamp",
+                },
+            ],
+            "measures": [
+                {"name": "Orders.count", "title": "Count", "description": "Number of orders"},
+                {
+                    "name": "Orders.total_amount",
+                    "title": "Total Amount",
+                    "description": "Total order amount",
+                },
+            ],
+        }
+    ]
+    return _DATA_DESC_PREFIX + yaml.dump(description, Dumper=YamlDumper, indent=2, sort_keys=True)
 
 
 class TestDataToYaml:
@@ -18,17 +89,14 @@ class TestDataToYaml:
         data = {"key": "value", "number": 42}
         result = data_to_yaml(data)
 
-        assert "key: value" in result
-        assert "number: 42" in result
+        assert yaml.load(result, Loader=YamlLoader) == data
 
     def test_data_to_yaml_list(self) -> None:
         """Test converting list to YAML."""
         data = ["item1", "item2", "item3"]
         result = data_to_yaml(data)
 
-        assert "- item1" in result
-        assert "- item2" in result
-        assert "- item3" in result
+        assert yaml.load(result, Loader=YamlLoader) == data
 
     def test_data_to_yaml_nested(self) -> None:
         """Test converting nested structure to YAML."""
@@ -40,26 +108,100 @@ class TestDataToYaml:
         }
         result = data_to_yaml(data)
 
-        assert "orders:" in result
-        assert "id: 1" in result
-        assert "status: completed" in result
+        assert yaml.load(result, Loader=YamlLoader) == data
+
+
+class TestPickTitle:
+    """Test cases for the _pick_title helper."""
+
+    def test_prefers_short_title(self) -> None:
+        """Test that shortTitle wins and title is the fallback."""
+        assert _pick_title({"shortTitle": "Count", "title": "Orders Count"}) == "Count"
+        assert _pick_title({"shortTitle": "", "title": "Orders Count"}) == "Orders Count"
+        assert _pick_title({}) is None
+
+
+class TestJson:
+    """Test cases for the JSON helpers."""
+
+    def test_to_json_is_compact(self) -> None:
+        """Test that JSON output has no insignificant whitespace."""
+        assert to_json({"a": [1, 2.5, None, "x"]}) == '{"a":[1,2.5,null,"x"]}'
+
+    def test_to_json_handles_wide_integers(self) -> None:
+        """Test that integers wider than 64 bits are still serialized."""
+        assert to_json({"big": 2**70}) == f'{{"big":{2**70}}}'
+
+    def test_from_json_round_trip(self) -> None:
+        """Test parsing bytes and strings."""
+        data = {"data": [{"Orders.count": "42"}]}
+
+        assert from_json(to_json(data).encode()) == data
+        assert from_json(to_json(data)) == data
+
+    def test_stdlib_fallback(self, monkeypatch) -> None:
+        """Test that the helpers work without orjson installed."""
+        monkeypatch.setattr(server, "orjson", None)
+        data = {"a": [1, 2.5, None, "x"]}
+
+        assert to_json(data) == '{"a":[1,2.5,null,"x"]}'
+        assert from_json(b'{"a":[1,2.5,null,"x"]}') == data
+
+
+class TestLazyJson:
+    """Test cases for the LazyJson log argument."""
+
+    def test_str_serializes(self) -> None:
+        """Test that formatting the argument produces JSON."""
+        assert str(LazyJson({"a": 1})) == '{"a":1}'
+
+    def test_not_serialized_when_filtered(self, monkeypatch) -> None:
+        """Test that no serialization happens when the log level filters the record."""
+        mock_to_json = Mock(return_value="{}")
+        monkeypatch.setattr(server, "to_json", mock_to_json)
+        logger = logging.getLogger("mcp_cube_server.test_lazy_json")
+        logger.setLevel(logging.WARNING)
+
+        logger.info("query: %s", LazyJson({"a": 1}))
+
+        mock_to_json.assert_not_called()
+
+
+class TestModuleImport:
+    """Test cases for importing the server module."""
+
+    def test_import_writes_nothing_to_stdout(self) -> None:
+        """Test that importing the server keeps stdout clean for the stdio transport."""
+        src_dir = Path(__file__).resolve().parents[2] / "src"
+        result = subprocess.run(
+            [sys.executable, "-c", "import mcp_cube_server.server"],
+            capture_output=True,
+            text=True,
+            check=True,
+            env={**os.environ, "PYTHONPATH": str(src_dir)},
+        )
+
+        assert result.stdout == ""
+
+    def test_package_exports_resolve(self) -> None:
+        """Test that every name in the package's __all__ resolves, including the lazy server."""
+        assert mcp_cube_server.server is server
+        assert all(hasattr(mcp_cube_server, name) for name in mcp_cube_server.__all__)
 
 
 class TestServerEndpoints:
     """Test cases for MCP server endpoints."""
 
-    @patch("mcp_cube_server.server.CubeClient")
-    @patch("mcp_cube_server.server.FastMCP")
-    def test_main_function_setup(
-        self,
-        mock_fastmcp_class: Mock,
-        mock_cube_client_class: Mock,
-    ) -> None:
+    def test_main_function_setup(self, monkeypatch) -> None:
         """Test main function setup."""
-        mock_mcp = Mock()
-        mock_fastmcp_class.return_value = mock_mcp
-        mock_client = Mock()
-        mock_cube_client_class.return_value = mock_client
+        started: list[str] = []
+
+        def run_spy(self: FastMCP) -> None:
+            started.append(self.name)
+
+        monkeypatch.setattr(FastMCP, "run", run_spy)
+        mock_cube_client_class = Mock(return_value=Mock())
+        monkeypatch.setattr(server, "CubeClient", mock_cube_client_class)
 
         credentials = {
             "endpoint": "https://cube.example.com",
@@ -78,316 +220,143 @@ class TestServerEndpoints:
             logger=logger,
         )
 
-        # Verify FastMCP was created
-        mock_fastmcp_class.assert_called_once_with("Cube.dev")
-
-        # Verify server was started
-        mock_mcp.run.assert_called_once()
+        # Verify the "Cube.dev" server was created and started once
+        assert started == ["Cube.dev"]
 
-    @patch("mcp_cube_server.server.CubeClient")
-    def test_data_description_resource(
+    async def test_read_data_results_served_from_template(
         self,
-        mock_cube_client_class: Mock,
-        mock_meta_response: dict[str, Any],
+        monkeypatch,
+        mock_cube_client: Mock,
+        mock_query_response: dict[str, Any],
     ) -> None:
-        """Test data_description resource endpoint."""
-        # Setup mock client
-        mock_client = Mock()
-        mock_client.describe.return_value = mock_meta_response
-        mock_cube_client_class.return_value = mock_client
-
-        # Import and call the decorated function directly
-        from mcp_cube_server.server import FastMCP
-
-        mcp = FastMCP("Test")
-
-        # Create the server with mocked client
-        _ = {
-            "endpoint": "https://cube.example.com",
-            "api_secret": "secret",
-            "token_payload": {},
+        """Test that read_data results are readable through the data://{data_id} template."""
+        monkeypatch.setattr(secrets, "token_hex", Mock(return_value="test-data-id"))
+        mock_cube_client.query.return_value = mock_query_response
+        mcp = _start_server(monkeypatch, mock_cube_client)
+        rows_json = to_json(mock_query_response["data"])
+
+        content, _ = await mcp.call_tool("read_data", {"query": {"measures": ["Orders.count"]}})
+
+        # The embedded resource carries the full document; data://{data_id} serves only the rows
+        text, embedded = content
+        assert isinstance(text, TextContent)
+        assert "data_id: test-data-id" in text.text
+        assert isinstance(embedded, EmbeddedResource)
+        assert isinstance(embedded.resource, TextResourceContents)
+        assert str(embedded.resource.uri) == "data://test-data-id"
+        assert embedded.resource.mimeType == "application/json"
+        assert from_json(embedded.resource.text) == {
+            "type": "data",
+            "data_id": "test-data-id",
+            "data": mock_query_response["data"],
         }
-        _ = Mock()
-
-        # We need to manually execute the main function logic
-        # to register the endpoints
-        client = mock_client
 
-        @mcp.resource("context://data_description")
-        def data_description() -> str:
-            meta = client.describe()
-            if error := meta.get("error"):
-                return f"Error: Description of the data is not available: {error}, {meta}"
+        templates = await mcp.list_resource_templates()
+        assert [template.uriTemplate for template in templates] == ["data://{data_id}"]
+        contents = await mcp.read_resource("data://test-data-id")
+        assert [content.content for content in contents] == [rows_json]
 
-            description = [
-                {
-                    "name": cube.get("name"),
-                    "title": cube.get("title"),
-                    "description": cube.get("description"),
-                    "dimensions": [
-                        {
-                            "name": dimension.get("name"),
-                            "title": dimension.get("shortTitle") or dimension.get("title"),
-                            "description": dimension.get("description"),
-                        }
-                        for dimension in cube.get("dimensions", [])
-                    ],
-                    "measures": [
-                        {
-                            "name": measure.get("name"),
-                            "title": measure.get("shortTitle") or measure.get("title"),
-                            "description": measure.get("description"),
-                        }
-                        for measure in cube.get("measures", [])
-                    ],
-                }
-                for cube in meta.get("cubes", [])
-            ]
-            return (
-                "Here is a description of the data available via the read_data tool:\n\n"
-                + yaml.dump(description, indent=2, sort_keys=True)
-            )
+    async def test_data_description_resource(
+        self,
+        monkeypatch,
+        mock_cube_client: Mock,
+        mock_meta_response: dict[str, Any],
+        expected_data_description: str,
+    ) -> None:
+        """Test that the description is rendered once and reused while the metadata is cached."""
+        mock_cube_client.describe.return_value = mock_meta_response
+        dump_spy = Mock(wraps=server._dump_yaml)
+        monkeypatch.setattr(server, "_dump_yaml", dump_spy)
+        mcp = _start_server(monkeypatch, mock_cube_client)
 
-        # Call the resource function
-        result = data_description()
+        first = await mcp.read_resource("context://data_description")
+        second = await mcp.read_resource("context://data_description")
 
-        assert "Orders" in result
-        assert "Order ID" in result
-        assert "Orders.count" in result
-        assert "Total Amount" in result
+        assert [content.content for content in first] == [expected_data_description]
+        assert [content.content for content in second] == [expected_data_description]
+        assert mock_cube_client.describe.call_count == 2
+        dump_spy.assert_called_once()
 
-    @patch("mcp_cube_server.server.CubeClient")
-    def test_data_description_with_error(
+    async def test_data_description_with_error(
         self,
-        mock_cube_client_class: Mock,
+        monkeypatch,
+        mock_cube_client: Mock,
         mock_error_response: dict[str, Any],
+        mock_meta_response: dict[str, Any],
+        expected_data_description: str,
     ) -> None:
-        """Test data_description resource with error response."""
-        mock_client = Mock()
-        mock_client.describe.return_value = mock_error_response
-        mock_cube_client_class.return_value = mock_client
-
-        from mcp_cube_server.server import FastMCP
+        """Test that metadata errors are reported and never reused as the rendered description."""
+        mock_cube_client.describe.return_value = mock_error_response
+        mcp = _start_server(monkeypatch, mock_cube_client)
 
-        mcp = FastMCP("Test")
-        logger = Mock()
-        client = mock_client
-
-        @mcp.resource("context://data_description")
-        def data_description() -> str:
-            meta = client.describe()
-            if error := meta.get("error"):
-                logger.error("Error in data_description: %s\n\n%s", error, meta.get("stack"))
-                logger.error("Full response: %s", json.dumps(meta))
-                return f"Error: Description of the data is not available: {error}, {meta}"
-
-            # ... rest of the function
-            return ""
+        contents = await mcp.read_resource("context://data_description")
 
-        result = data_description()
-
-        assert "Error: Description of the data is not available" in result
+        (result,) = [content.content for content in contents]
+        assert isinstance(result, str)
+        assert result.startswith("Error: Description of the data is not available")
         assert "Query execution error" in result
 
-    @patch("mcp_cube_server.server.CubeClient")
-    @patch("mcp_cube_server.server.uuid.uuid4")
-    def test_read_data_tool_success(
+        mock_cube_client.describe.return_value = mock_meta_response
+        contents = await mcp.read_resource("context://data_description")
+        assert [content.content for content in contents] == [expected_data_description]
+
+    @pytest.mark.parametrize(
+        ("client_behavior", "expected_error"),
+        [
+            ("success", None),
+            ("error", "Error: Query execution error"),
+            ("exception", "Error: Unexpected error"),
+        ],
+    )
+    async def test_read_data_tool(
         self,
-        mock_uuid: Mock,
-        mock_cube_client_class: Mock,
+        client_behavior: str,
+        expected_error: str | None,
+        mock_cube_client: Mock,
         mock_query_response: dict[str, Any],
-    ) -> None:
-        """Test read_data tool with successful response."""
-        # Setup mocks
-        mock_uuid.return_value = "test-uuid-1234"
-        mock_client = Mock()
-        mock_client.query.return_value = mock_query_response
-        mock_cube_client_class.return_value = mock_client
-
-        from mcp_cube_server.server import FastMCP
-
-        mcp = FastMCP("Test")
-        logger = Mock()
-        client = mock_client
-
-        @mcp.tool("read_data")
-        def read_data(query: Query) -> Any:
-            try:
-                query_dict = query.model_dump(by_alias=True, exclude_none=True)
-                logger.info("read_data called with query: %s", json.dumps(query_dict))
-                response = client.query(query_dict)
-                if error := response.get("error"):
-                    logger.error("Error in read_data: %s\n\n%s", error, response.get("stack"))
-                    logger.error("Full response: %s", json.dumps(response))
-                    return f"Error: {error}"
-                data = response.get("data", [])
-                logger.info("read_data returned %s rows", len(data))
-
-                data_id = str(uuid.uuid4())
-
-                @mcp.resource(f"data://{data_id}")
-                def data_resource() -> str:
-                    return json.dumps(data)
-
-                logger.info("Added results as resource with ID: %s", data_id)
-
-                output = {
-                    "type": "data",
-                    "data_id": data_id,
-                    "data": data,
-                }
-                yaml_output = data_to_yaml(output)
-                json_output = json.dumps(output)
-
-                # Return list of contents (simplified for testing)
-                return [
-                    {"type": "text", "text": yaml_output},
-                    {
-                        "type": "resource",
-                        "resource": {
-                            "uri": f"data://{data_id}",
-                            "text": json_output,
-                            "mimeType": "application/json",
-                        },
-                    },
-                ]
-
-            except Exception as e:
-                logger.error("Error in read_data: %s", str(e))
-                return f"Error: {str(e)}"
-
-        # Test the tool
-        query = Query(measures=["Orders.count"])
-        result = read_data(query)
-
-        assert isinstance(result, list)
-        assert len(result) == 2
-        assert result[0]["type"] == "text"
-        assert "data_id: test-uuid-1234" in result[0]["text"]
-        assert result[1]["type"] == "resource"
-
-    @patch("mcp_cube_server.server.CubeClient")
-    def test_read_data_tool_with_error(
-        self,
-        mock_cube_client_class: Mock,
         mock_error_response: dict[str, Any],
+        monkeypatch,
     ) -> None:
-        """Test read_data tool with error response."""
-        mock_client = Mock()
-        mock_client.query.return_value = mock_error_response
-        mock_cube_client_class.return_value = mock_client
-
-        from mcp_cube_server.server import FastMCP
-
-        mcp = FastMCP("Test")
-        logger = Mock()
-        client = mock_client
-
-        @mcp.tool("read_data")
-        def read_data(query: Query) -> Any:
-            try:
-                query_dict = query.model_dump(by_alias=True, exclude_none=True)
-                response = client.query(query_dict)
-                if error := response.get("error"):
-                    logger.error("Error in read_data: %s\n\n%s", error, response.get("stack"))
-                    return f"Error: {error}"
-                return response
-            except Exception as e:
-                return f"Error: {str(e)}"
-
-        query = Query(measures=["Orders.count"])
-        result = read_data(query)
-
-        assert "Error: Query execution error" in result
-
-    @patch("mcp_cube_server.server.CubeClient")
-    def test_read_data_tool_with_exception(
-        self,
-        mock_cube_client_class: Mock,
-    ) -> None:
-        """Test read_data tool with exception during processing."""
-        mock_client = Mock()
-        mock_client.query.side_effect = Exception("Unexpected error")
-        mock_cube_client_class.return_value = mock_client
-
-        from mcp_cube_server.server import FastMCP
-
-        mcp = FastMCP("Test")
-        logger = Mock()
-        client = mock_client
-
-        @mcp.tool("read_data")
-        def read_data(query: Query) -> Any:
-            try:
-                query_dict = query.model_dump(by_alias=True, exclude_none=True)
-                response = client.query(query_dict)
-                return response
-            except Exception as e:
-                logger.error("Error in read_data: %s", str(e))
-                return f"Error: {str(e)}"
-
-        query = Query(measures=["Orders.count"])
-        result = read_data(query)
-
-        assert "Error: Unexpected error" in result
+        """Test read_data tool with successful, error and failing client responses."""
+        monkeypatch.setattr(secrets, "token_hex", Mock(return_value="test-data-id"))
+        if client_behavior == "success":
+            mock_cube_client.query.return_value = mock_query_response
+        elif client_behavior == "error":
+            mock_cube_client.query.return_value = mock_error_response
+        else:
+            mock_cube_client.query.side_effect = Exception("Unexpected error")
+        mcp = _start_server(monkeypatch, mock_cube_client)
+
+        content, structured = await mcp.call_tool(
+            "read_data", {"query": {"measures": ["Orders.count"]}}
+        )
 
-    @patch("mcp_cube_server.server.CubeClient")
-    def test_describe_data_tool(
+        mock_cube_client.query.assert_called_once_with(
+            Query(measures=["Orders.count"]).to_cube_dict()
+        )
+        if expected_error is not None:
+            assert structured == {"result": expected_error}
+            with pytest.raises(ValueError, match="Unknown data id"):
+                await mcp.read_resource("data://test-data-id")
+            return
+        text, embedded = content
+        assert isinstance(text, TextContent)
+        assert "data_id: test-data-id" in text.text
+        assert isinstance(embedded, EmbeddedResource)
+        contents = await mcp.read_resource("data://test-data-id")
+        assert [content.content for content in contents] == [to_json(mock_query_response["data"])]
+
+    async def test_describe_data_tool(
         self,
-        mock_cube_client_class: Mock,
+        monkeypatch,
+        mock_cube_client: Mock,
         mock_meta_response: dict[str, Any],
+        expected_data_description: str,
     ) -> None:
         """Test describe_data tool."""
-        mock_client = Mock()
-        mock_client.describe.return_value = mock_meta_response
-        mock_cube_client_class.return_value = mock_client
-
-        from mcp_cube_server.server import FastMCP
-
-        mcp = FastMCP("Test")
-        client = mock_client
-
-        # Define data_description function first
-        def data_description() -> str:
-            meta = client.describe()
-            if error := meta.get("error"):
-                return f"Error: Description of the data is not available: {error}, {meta}"
-
-            description = [
-                {
-                    "name": cube.get("name"),
-                    "title": cube.get("title"),
-                    "description": cube.get("description"),
-                    "dimensions": [
-                        {
-                            "name": dimension.get("name"),
-                            "title": dimension.get("shortTitle") or dimension.get("title"),
-                            "description": dimension.get("description"),
-                        }
-                        for dimension in cube.get("dimensions", [])
-                    ],
-                    "measures": [
-                        {
-                            "name": measure.get("name"),
-                            "title": measure.get("shortTitle") or measure.get("title"),
-                            "description": measure.get("description"),
-                        }
-                        for measure in cube.get("measures", [])
-                    ],
-                }
-                for cube in meta.get("cubes", [])
-            ]
-            return (
-                "Here is a description of the data available via the read_data tool:\n\n"
-                + yaml.dump(description, indent=2, sort_keys=True)
-            )
-
-        @mcp.tool("describe_data")
-        def describe_data() -> dict[str, str]:
-            return {"type": "text", "text": data_description()}
+        mock_cube_client.describe.return_value = mock_meta_response
+        mcp = _start_server(monkeypatch, mock_cube_client)
 
-        result = describe_data()
+        _, structured = await mcp.call_tool("describe_data", {})
 
-        assert result["type"] == "text"
-        assert "Orders" in result["text"]
-        assert "Orders.count" in result["text"]
+        assert structured == {"type": "text", "text": expected_data_description}